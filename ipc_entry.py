@@ -8,10 +8,18 @@ import time
 temp_dir = tempfile.gettempdir()
 log_file = os.path.join(temp_dir, 'better_via_stitcher.log')
 
+# Open the log once, line-buffered; opening and closing the file for
+# every message adds a few syscalls per call and slows startup.
+try:
+    _log_fh = open(log_file, 'a', buffering=1)
+except OSError:
+    _log_fh = None
+
 def log(msg):
-    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {msg}")
-    with open(log_file, 'a') as f:
-        f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {msg}\n")
+    line = f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {msg}"
+    print(line)
+    if _log_fh is not None:
+        _log_fh.write(line + "\n")
 
 # Log start immediately
 log("Plugin process started.")
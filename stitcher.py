@@ -1,123 +1,375 @@
 import wx
 import math
+import os
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from scipy import ndimage
 from kipy.board_types import Via, BoardItem
 from kipy.geometry import Vector2, Box2
 
+# Numba is optional: if it's missing (e.g. stripped-down KiCad Python
+# environment) we fall back to the vectorized numpy implementations.
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    @njit(cache=True, nogil=True)
+    def _rasterize_polygon_nb(bitmap, pts, value, clear):
+        """Scanline-fill a polygon (pixel coords) using an Active Edge Table."""
+        n = pts.shape[0]
+        if n < 3:
+            return
+        height, width = bitmap.shape
+
+        # Edge table (horizontal edges dropped)
+        ex0 = np.empty(n, np.int64)
+        ey0 = np.empty(n, np.int64)
+        edx = np.empty(n, np.int64)
+        edy = np.empty(n, np.int64)
+        ymin = np.empty(n, np.int64)
+        ymax = np.empty(n, np.int64)
+        m = 0
+        for i in range(n):
+            j = (i + 1) % n
+            ya = pts[i, 1]
+            yb = pts[j, 1]
+            if ya == yb:
+                continue
+            ex0[m] = pts[i, 0]
+            ey0[m] = ya
+            # Deltas are precomputed per edge; the division stays in the
+            # row loop because (y - y0) * dx is exact in int64 while a
+            # reciprocal slope would round before the multiply and can
+            # land intersections one pixel short at integer crossings.
+            edx[m] = pts[j, 0] - pts[i, 0]
+            edy[m] = yb - ya
+            ymin[m] = min(ya, yb)
+            ymax[m] = max(ya, yb)
+            m += 1
+        if m == 0:
+            return
+
+        order = np.argsort(ymin[:m])
+        active = np.empty(m, np.int64)
+        xs = np.empty(m, np.int64)
+        n_active = 0
+        ptr = 0
+
+        y = max(0, ymin[order[0]])
+        while y < height:
+            # Activate edges whose span starts at or before this row
+            while ptr < m and ymin[order[ptr]] <= y:
+                e = order[ptr]
+                if ymax[e] > y:
+                    active[n_active] = e
+                    n_active += 1
+                ptr += 1
+
+            # Drop edges whose span has ended
+            k = 0
+            for a in range(n_active):
+                e = active[a]
+                if ymax[e] > y:
+                    active[k] = e
+                    k += 1
+            n_active = k
+
+            if n_active == 0:
+                if ptr >= m:
+                    break
+                y += 1
+                continue
+
+            for a in range(n_active):
+                e = active[a]
+                x = ex0[e] + (y - ey0[e]) * edx[e] / edy[e]
+                xs[a] = int(x)
+            row = np.sort(xs[:n_active])
+
+            for i2 in range(0, n_active - 1, 2):
+                xa = max(0, row[i2])
+                xb = min(width - 1, row[i2 + 1])
+                for xc in range(xa, xb + 1):
+                    if clear:
+                        bitmap[y, xc] = 0
+                    else:
+                        bitmap[y, xc] += value
+            y += 1
+
+    @njit(cache=True, nogil=True)
+    def _draw_circle_nb(bitmap, cx, cy, r):
+        """Stamp a filled circle row by row: one span per scanline."""
+        height, width = bitmap.shape
+        y_lo = max(0, cy - r)
+        y_hi = min(height, cy + r + 1)
+        r2 = r * r
+        for y in range(y_lo, y_hi):
+            dy = y - cy
+            half = int(math.sqrt(r2 - dy * dy))
+            x_lo = max(0, cx - half)
+            x_hi = min(width, cx + half + 1)
+            for x in range(x_lo, x_hi):
+                bitmap[y, x] = 1
+
+    @njit(cache=True, nogil=True)
+    def _draw_line_nb(bitmap, x1, y1, x2, y2, w):
+        """Stamp a thick line as a capsule: every pixel within w//2 of the segment."""
+        r = w // 2
+        if x1 == x2 and y1 == y2:
+            _draw_circle_nb(bitmap, x1, y1, r)
+            return
+        height, width = bitmap.shape
+        y_lo = max(0, min(y1, y2) - r)
+        y_hi = min(height, max(y1, y2) + r + 1)
+        x_lo = max(0, min(x1, x2) - r)
+        x_hi = min(width, max(x1, x2) + r + 1)
+        dx = x2 - x1
+        dy = y2 - y1
+        length2 = dx * dx + dy * dy
+        r2 = r * r
+        for y in range(y_lo, y_hi):
+            for x in range(x_lo, x_hi):
+                # Project onto the segment, clamped to its endpoints
+                t = ((x - x1) * dx + (y - y1) * dy) / length2
+                if t < 0.0:
+                    t = 0.0
+                elif t > 1.0:
+                    t = 1.0
+                ex = x - (x1 + t * dx)
+                ey = y - (y1 + t * dy)
+                if ex * ex + ey * ey <= r2:
+                    bitmap[y, x] = 1
+
+
+@functools.lru_cache(maxsize=64)
+def _disk_spans(r):
+    """
+    Per-row half-widths of a radius-r disk: for each row offset in
+    -r..r, the largest |dx| with dx^2 + dy^2 <= r^2. Boards reuse a
+    handful of pad/via radii, so the tables are cached.
+    """
+    ys = np.arange(-r, r + 1)
+    return ys, np.sqrt(r * r - ys * ys).astype(np.int64)
+
+
+# Set-bit count for every byte value, used to turn bit-packed layer
+# planes into per-pixel layer counts.
+_POPCOUNT_LUT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _nodes_to_px_array(nodes, bbox, resolution):
+    """
+    Convert a list of PolyLineNode objects to an (N, 2) int64 array of
+    pixel coordinates. Done once per polygon so the fill kernels only
+    ever see raw numpy arrays.
+    """
+    return np.array(
+        [(int((node.point.x - bbox.pos.x) / resolution),
+          int((node.point.y - bbox.pos.y) / resolution)) for node in nodes],
+        dtype=np.int64)
+
+
+def _rasterize_polygon_np(bitmap, pts, value, clear):
+    """Numpy fallback for polygon scanline fill (pixel coords)."""
+    if pts.shape[0] < 3:
+        return
+
+    height, width = bitmap.shape
+
+    # Edge endpoint arrays (each vertex paired with the next, wrapping)
+    x0 = pts[:, 0]
+    y0 = pts[:, 1]
+    x1 = np.roll(x0, -1)
+    y1 = np.roll(y0, -1)
+
+    # Skip horizontal edges
+    keep = y0 != y1
+    if not keep.any():
+        return
+    x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+
+    # Build the edge table: the scanline range each edge is active in
+    # (half-open rule: min(y0,y1) <= y < max(y0,y1)), clipped to the
+    # bitmap. Total work is proportional to the sum of active rows per
+    # edge, not rows x edges.
+    y_lo = np.clip(np.minimum(y0, y1), 0, height)
+    y_hi = np.clip(np.maximum(y0, y1), 0, height)
+    counts = y_hi - y_lo
+    active = counts > 0
+    if not active.any():
+        return
+    x0, y0, x1, y1 = x0[active], y0[active], x1[active], y1[active]
+    y_lo, counts = y_lo[active], counts[active]
+
+    # Expand the table into one flat (row, x) intersection list:
+    # edge i contributes counts[i] consecutive scanlines from y_lo[i].
+    starts = np.concatenate(([0], np.cumsum(counts[:-1])))
+    eidx = np.repeat(np.arange(len(counts)), counts)
+    rows = np.arange(counts.sum()) - np.repeat(starts, counts) + np.repeat(y_lo, counts)
+    xs = (x0[eidx] + (rows - y0[eidx]) * (x1[eidx] - x0[eidx])
+          / (y1[eidx] - y0[eidx])).astype(np.int64)
+
+    # Sort intersections by (row, x); each row has an even count, so
+    # even/odd elements are the span entry/exit points.
+    order = np.lexsort((xs, rows))
+    rows = rows[order]
+    xs = xs[order]
+
+    # Build per-row span toggles: +1 at entry, -1 one past exit
+    # (exit pixel inclusive, matching the original pairwise fill).
+    toggles = np.zeros((height, width + 1), dtype=np.int64)
+    np.add.at(toggles, (rows[0::2], np.clip(xs[0::2], 0, width)), 1)
+    np.add.at(toggles, (rows[1::2], np.clip(xs[1::2] + 1, 0, width)), -1)
+
+    # Cumulative sum along each row gives the span coverage count
+    coverage = np.cumsum(toggles, axis=1)[:, :width]
+    if clear:
+        bitmap[coverage > 0] = 0
+    else:
+        bitmap += (coverage * value).astype(bitmap.dtype)
+
+
 class ViaStitcher:
     def __init__(self, board):
         self.board = board
+        # Per-run caches of board collections. Every board.get_*() call is
+        # a full IPC round-trip that deserializes the whole collection, so
+        # stitch() fetches each one once and clears them when it finishes.
+        self._pads = None
+        self._vias = None
+        self._tracks = None
+        self._zones = None
+        self._nets = None
+
+    def _get_pads(self):
+        return self._pads if self._pads is not None else self.board.get_pads()
+
+    def _get_vias(self):
+        return self._vias if self._vias is not None else self.board.get_vias()
 
-    def rasterize_polygon(self, bitmap, nodes, bbox, resolution, value=1):
+    def _get_tracks(self):
+        return self._tracks if self._tracks is not None else self.board.get_tracks()
+
+    def _get_zones(self):
+        return self._zones if self._zones is not None else self.board.get_zones()
+
+    def _get_nets(self):
+        return self._nets if self._nets is not None else self.board.get_nets()
+
+    def rasterize_polygon(self, bitmap, nodes, bbox, resolution, value=1, mode='add'):
         """
         Rasterize a polygon onto a bitmap using scanline fill.
-        
+
+        Converts the nodes to a pixel-coordinate array once, then hands
+        off to the Numba-compiled kernel (Active Edge Table) when
+        available, or the vectorized numpy fill otherwise.
+
         Args:
             bitmap: 2D numpy array
-            nodes: List of PolyLineNode objects
+            nodes: List of PolyLineNode objects, or an (N, 2) pixel
+                   coordinate array already built by _nodes_to_px_array
             bbox: Bounding box for coordinate transformation
             resolution: nm per pixel
-            value: Value to add to pixels inside polygon
+            value: Value to add to pixels inside polygon (mode='add')
+            mode: 'add' to add value inside the polygon, 'clear' to zero
+                  the covered pixels in place (used for zone holes)
         """
         if len(nodes) < 3:
             return
-            
-        # Convert nodes to pixel coordinates
-        points = []
-        for node in nodes:
-            px = int((node.point.x - bbox.pos.x) / resolution)
-            py = int((node.point.y - bbox.pos.y) / resolution)
-            points.append((px, py))
-        
-        # Scanline fill algorithm
-        height, width = bitmap.shape
-        
-        for y in range(height):
-            intersections = []
-            for i in range(len(points)):
-                p1 = points[i]
-                p2 = points[(i + 1) % len(points)]
-                
-                if p1[1] == p2[1]:  # Horizontal edge
-                    continue
-                    
-                if y < min(p1[1], p2[1]) or y >= max(p1[1], p2[1]):
-                    continue
-                
-                # Calculate x intersection
-                x = p1[0] + (y - p1[1]) * (p2[0] - p1[0]) / (p2[1] - p1[1])
-                intersections.append(int(x))
-            
-            intersections.sort()
-            
-            # Fill between pairs of intersections
-            for i in range(0, len(intersections) - 1, 2):
-                x1 = max(0, intersections[i])
-                x2 = min(width - 1, intersections[i + 1])
-                if x1 <= x2:
-                    bitmap[y, x1:x2+1] += value
+
+        if isinstance(nodes, np.ndarray):
+            points = nodes
+        else:
+            points = _nodes_to_px_array(nodes, bbox, resolution)
+
+        clear = mode == 'clear'
+        if HAS_NUMBA:
+            _rasterize_polygon_nb(bitmap, points, value, clear)
+        else:
+            _rasterize_polygon_np(bitmap, points, value, clear)
 
     def rasterize_zones_by_layer(self, zones, bbox, resolution):
         """
         Create a bitmap where each pixel value = number of layers with zone coverage.
-        
+
+        Each layer rasterizes into its own bitmap, so the per-layer work
+        is dispatched to a thread pool (the fill kernels release the GIL).
+        The layer planes are then bit-packed into one uint64 raster and
+        counted per pixel with a byte popcount table.
+
         Returns:
-            2D numpy array with layer counts
+            2D numpy array (uint8) with layer counts
         """
         width = int(bbox.size.x / resolution) + 1
         height = int(bbox.size.y / resolution) + 1
-        bitmap = np.zeros((height, width), dtype=np.int32)
-        
-        # Track which layers we've seen at each pixel
-        layer_maps = {}
-        
+        bitmap = np.zeros((height, width), dtype=np.uint8)
+
+        # Group the polygons by layer, preserving order within each layer
+        layer_polys = {}
         for zone in zones:
             if not hasattr(zone, 'filled_polygons'):
                 continue
-                
+
             polys_dict = zone.filled_polygons
             if not hasattr(polys_dict, 'values'):
                 continue
-            
+
             for layer_id, poly_list in polys_dict.items():
                 if not poly_list:
                     continue
-                    
-                # Create layer-specific bitmap if needed
-                if layer_id not in layer_maps:
-                    layer_maps[layer_id] = np.zeros((height, width), dtype=np.uint8)
-                
                 for poly in poly_list:
                     if not hasattr(poly, 'outline') or not hasattr(poly.outline, 'nodes'):
                         continue
-                    
-                    nodes = list(poly.outline.nodes)
-                    self.rasterize_polygon(layer_maps[layer_id], nodes, bbox, resolution, value=1)
-                    
-                    # Handle holes
-                    if hasattr(poly, 'holes'):
-                        for hole in poly.holes:
-                            if hasattr(hole, 'nodes'):
-                                hole_nodes = list(hole.nodes)
-                                # Subtract hole (set to 0)
-                                temp = np.zeros((height, width), dtype=np.uint8)
-                                self.rasterize_polygon(temp, hole_nodes, bbox, resolution, value=1)
-                                layer_maps[layer_id] = np.where(temp > 0, 0, layer_maps[layer_id])
-        
-        # Count layers at each pixel
-        for layer_bitmap in layer_maps.values():
-            bitmap += (layer_bitmap > 0).astype(np.int32)
-        
-        return bitmap
+                    layer_polys.setdefault(layer_id, []).append(poly)
+
+        if not layer_polys:
+            return bitmap
 
-    def rasterize_obstacles(self, net_name, bbox, resolution, ignored_zone_ids=None):
+        def fill_layer(polys):
+            layer_bitmap = np.zeros((height, width), dtype=np.uint8)
+            for poly in polys:
+                nodes = list(poly.outline.nodes)
+                self.rasterize_polygon(layer_bitmap, nodes, bbox, resolution, value=1)
+
+                # Handle holes: clear them out of the layer map in place
+                if hasattr(poly, 'holes'):
+                    for hole in poly.holes:
+                        if hasattr(hole, 'nodes'):
+                            hole_nodes = list(hole.nodes)
+                            self.rasterize_polygon(layer_bitmap, hole_nodes, bbox, resolution, mode='clear')
+            return layer_bitmap
+
+        if len(layer_polys) > 1:
+            workers = min(len(layer_polys), os.cpu_count() or 4)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                layer_bitmaps = list(pool.map(fill_layer, layer_polys.values()))
+        else:
+            layer_bitmaps = [fill_layer(next(iter(layer_polys.values())))]
+
+        # Pack each layer into a bit plane of one uint64 raster (KiCad
+        # boards have at most 32 copper layers), then count set bits per
+        # pixel through the byte LUT.
+        layer_bits = np.zeros((height, width), dtype=np.uint64)
+        for i, layer_bitmap in enumerate(layer_bitmaps):
+            layer_bits |= (layer_bitmap > 0).astype(np.uint64) << np.uint64(i)
+
+        bytes_view = layer_bits.view(np.uint8).reshape(height, width, 8)
+        return _POPCOUNT_LUT[bytes_view].sum(axis=2, dtype=np.uint8)
+
+    def rasterize_obstacles(self, net_name, bbox, resolution, ignored_zone_ids=None, other_zones=None):
         """
         Create a bitmap of all obstacles (pads, tracks, vias, zones of other nets).
-        
+
         Args:
             ignored_zone_ids: Set of zone UUIDs to skip.
-            
+            other_zones: Pre-filtered list of obstacle zones; when None,
+                the board's zones are classified here instead.
+
         Returns:
             2D numpy array (1 = obstacle, 0 = free)
         """
@@ -134,39 +386,48 @@ class ViaStitcher:
             return px, py
         
         def draw_circle(cx, cy, radius_px):
-            """Draw filled circle on bitmap"""
-            y_coords, x_coords = np.ogrid[:height, :width]
-            mask = (x_coords - cx)**2 + (y_coords - cy)**2 <= radius_px**2
-            bitmap[mask] = 1
-        
+            """Draw filled circle on bitmap via cached per-row spans"""
+            if HAS_NUMBA:
+                _draw_circle_nb(bitmap, cx, cy, radius_px)
+                return
+            ys, half_widths = _disk_spans(radius_px)
+            for dy, half in zip(ys, half_widths):
+                y = cy + dy
+                if y < 0 or y >= height:
+                    continue
+                x_lo = max(0, cx - half)
+                x_hi = min(width, cx + half + 1)
+                if x_lo < x_hi:
+                    bitmap[y, x_lo:x_hi] = 1
+
         def draw_line(x1, y1, x2, y2, width_px):
-            """Draw thick line on bitmap"""
-            # Bresenham with thickness
-            dx = abs(x2 - x1)
-            dy = abs(y2 - y1)
-            sx = 1 if x1 < x2 else -1
-            sy = 1 if y1 < y2 else -1
-            err = dx - dy
-            
-            points = []
-            while True:
-                points.append((x1, y1))
-                if x1 == x2 and y1 == y2:
-                    break
-                e2 = 2 * err
-                if e2 > -dy:
-                    err -= dy
-                    x1 += sx
-                if e2 < dx:
-                    err += dx
-                    y1 += sy
-            
-            # Draw circles at each point for thickness
-            for px, py in points:
-                draw_circle(px, py, width_px // 2)
+            """Draw thick line on bitmap as a single capsule mask"""
+            if HAS_NUMBA:
+                _draw_line_nb(bitmap, x1, y1, x2, y2, width_px)
+                return
+            r = width_px // 2
+            if x1 == x2 and y1 == y2:
+                draw_circle(x1, y1, r)
+                return
+            y_lo = max(0, min(y1, y2) - r)
+            y_hi = min(height, max(y1, y2) + r + 1)
+            x_lo = max(0, min(x1, x2) - r)
+            x_hi = min(width, max(x1, x2) + r + 1)
+            if y_lo >= y_hi or x_lo >= x_hi:
+                return
+            dx = x2 - x1
+            dy = y2 - y1
+            length2 = dx * dx + dy * dy
+            y_coords, x_coords = np.ogrid[y_lo:y_hi, x_lo:x_hi]
+            # Project each pixel onto the segment, clamped to its endpoints
+            t = np.clip(((x_coords - x1) * dx + (y_coords - y1) * dy) / length2, 0.0, 1.0)
+            ex = x_coords - (x1 + t * dx)
+            ey = y_coords - (y1 + t * dy)
+            mask = ex * ex + ey * ey <= r * r
+            bitmap[y_lo:y_hi, x_lo:x_hi][mask] = 1
         
         # Pads
-        for p in self.board.get_pads():
+        for p in self._get_pads():
             if p.net and p.net.name == net_name:
                 continue
             
@@ -188,7 +449,7 @@ class ViaStitcher:
             draw_circle(px, py, radius_px)
         
         # Vias
-        for v in self.board.get_vias():
+        for v in self._get_vias():
             if v.net and v.net.name == net_name:
                 continue
             px, py = to_pixel(v.position)
@@ -267,7 +528,7 @@ class ViaStitcher:
                 x2, y2 = to_pixel(arc.end)
                 draw_line(x1, y1, x2, y2, width_px)
 
-        for t in self.board.get_tracks():
+        for t in self._get_tracks():
             if t.net and t.net.name == net_name:
                 continue
             
@@ -288,29 +549,46 @@ class ViaStitcher:
                 x2, y2 = to_pixel(t.end)
                 draw_line(x1, y1, x2, y2, width_px)
         
-        # Zones of other nets
-        for zone in self.board.get_zones():
-            if zone.net and zone.net.name == net_name:
-                continue
-            if not zone.filled:
-                continue
-                
-            # Check if ignored
-            if hasattr(zone.id, 'value'):
-                z_id = zone.id.value
-            else:
-                z_id = str(zone.id)
-                
-            if z_id in ignored_zone_ids:
-                continue
-                
+        # Zones of other nets. stitch() passes these pre-classified; when
+        # called standalone, filter the board's zones here.
+        if other_zones is None:
+            other_zones = []
+            for zone in self._get_zones():
+                if zone.net and zone.net.name == net_name:
+                    continue
+                if not zone.filled:
+                    continue
+
+                # Check if ignored
+                if hasattr(zone.id, 'value'):
+                    z_id = zone.id.value
+                else:
+                    z_id = str(zone.id)
+
+                if z_id in ignored_zone_ids:
+                    continue
+                other_zones.append(zone)
+
+        for zone in other_zones:
             if not hasattr(zone, 'filled_polygons'):
                 continue
-            
+
+            # Skip zones that don't overlap the stitch area at all
+            if hasattr(zone, 'bounding_box'):
+                try:
+                    zb = zone.bounding_box()
+                    if (zb.pos.x > bbox.pos.x + bbox.size.x or
+                            zb.pos.y > bbox.pos.y + bbox.size.y or
+                            zb.pos.x + zb.size.x < bbox.pos.x or
+                            zb.pos.y + zb.size.y < bbox.pos.y):
+                        continue
+                except:
+                    pass
+
             polys_dict = zone.filled_polygons
             if not hasattr(polys_dict, 'values'):
                 continue
-            
+
             for poly_list in polys_dict.values():
                 if not poly_list:
                     continue
@@ -337,11 +615,19 @@ class ViaStitcher:
         clearance_px = int(clearance_nm / resolution)
         if clearance_px < 1:
             return bitmap
-        
-        # Erosion = shrink valid areas
-        structure = np.ones((2*clearance_px+1, 2*clearance_px+1))
-        eroded = ndimage.binary_erosion(bitmap, structure=structure)
-        return eroded.astype(np.uint8)
+
+        # Nothing to erode (e.g. the chosen net has no usable region)
+        if not bitmap.any():
+            return bitmap
+
+        # Threshold the Euclidean distance transform instead of running a
+        # structuring-element erosion: O(H*W) regardless of clearance size,
+        # and a disk is the right shape for a circular via clearance anyway
+        # (the old square element was over-conservative on diagonals).
+        # Pad with a zero border so the bitmap edge erodes like before.
+        padded = np.pad(bitmap != 0, 1)
+        distance = ndimage.distance_transform_edt(padded)[1:-1, 1:-1]
+        return (distance > clearance_px).astype(np.uint8)
 
     def get_candidate_nets(self):
         """
@@ -351,7 +637,7 @@ class ViaStitcher:
         nets_with_zones = {}
         
         # Iterate over all zones to map nets to layers
-        for zone in self.board.get_zones():
+        for zone in self._get_zones():
             if not zone.filled:
                 continue
                 
@@ -385,7 +671,7 @@ class ViaStitcher:
         Format: [{'id': str, 'name': str, 'net': str, 'layers': list}]
         """
         other_zones = []
-        for zone in self.board.get_zones():
+        for zone in self._get_zones():
 
             net_name = zone.net.name if zone.net else "No Net"
             if net_name == target_net_name:
@@ -434,30 +720,60 @@ class ViaStitcher:
         Returns:
             int: Number of vias added.
         """
+        # Fetch each board collection once for the whole run; every
+        # helper below iterates these caches instead of re-querying.
+        self._pads = list(self.board.get_pads())
+        self._vias = list(self.board.get_vias())
+        self._tracks = list(self.board.get_tracks())
+        self._zones = list(self.board.get_zones())
+        self._nets = list(self.board.get_nets())
+        try:
+            return self._stitch(net_name, via_diameter, via_drill, grid_x, grid_y,
+                                offset_x, offset_y, stagger, ignored_zone_ids,
+                                refill_after, progress_callback)
+        finally:
+            self._pads = None
+            self._vias = None
+            self._tracks = None
+            self._zones = None
+            self._nets = None
+
+    def _stitch(self, net_name, via_diameter, via_drill, grid_x, grid_y, offset_x, offset_y, stagger, ignored_zone_ids, refill_after, progress_callback):
         if ignored_zone_ids is None:
             ignored_zone_ids = set()
         else:
             ignored_zone_ids = set(ignored_zone_ids)
-            
+
         # 1. Get Net Object and Zones
-        target_net = None
-        # Nets can be retrieved by get_nets(). Need finding by name.
-        # Ideally board.get_nets() returns a map or list.
-        # We'll just iterate for now.
-        for net in self.board.get_nets():
-            if net.name == net_name:
-                target_net = net
-                break
-        
+        nets_by_name = {net.name: net for net in self._get_nets()}
+        target_net = nets_by_name.get(net_name)
+
         if not target_net:
             return 0
 
-        # Get all zones for this net
-        zones = [z for z in self.board.get_zones() if z.net and z.net.name == net_name and z.filled]
-        
+        # Classify all filled zones in one pass: this net's zones to
+        # stitch vs other-net zones that act as obstacles.
+        zones = []
+        other_zones = []
+        for zone in self._get_zones():
+            if not zone.filled:
+                continue
+            if zone.net and zone.net.name == net_name:
+                zones.append(zone)
+                continue
+
+            if hasattr(zone.id, 'value'):
+                z_id = zone.id.value
+            else:
+                z_id = str(zone.id)
+
+            if z_id in ignored_zone_ids:
+                continue
+            other_zones.append(zone)
+
         if progress_callback:
             progress_callback(10, "Found zones for net")
-        
+
         if not zones:
             return 0
 
@@ -477,8 +793,13 @@ class ViaStitcher:
             return 0
             
         # 2b. Generate Bitmaps
-        # Resolution: 100000 nm = 0.1mm per pixel (good balance of accuracy vs performance)
-        RESOLUTION = 100000
+        # Resolution adapts to the grid pitch: at least 10 bitmap pixels
+        # per grid step so placement accuracy tracks the user's spacing,
+        # but never finer than 25000 nm (0.025mm) per pixel. Coarse grids
+        # get quadratically smaller bitmaps this way - a 300x300mm board
+        # at a 5mm pitch no longer rasterizes at sub-mm resolution.
+        min_grid_nm = min(grid_x, grid_y) * 1000000
+        RESOLUTION = int(max(25000, min_grid_nm // 10))
         CLEARANCE = 250000  # 0.25mm
         
         # Step 1: Rasterize target net zones (count layers)
@@ -490,13 +811,16 @@ class ViaStitcher:
             progress_callback(35, "Rasterizing obstacles...")
         
         # Step 2: Rasterize all obstacles
-        obstacle_bitmap = self.rasterize_obstacles(net_name, overall_bbox, RESOLUTION, ignored_zone_ids)
+        obstacle_bitmap = self.rasterize_obstacles(net_name, overall_bbox, RESOLUTION, ignored_zone_ids, other_zones=other_zones)
         
         if progress_callback:
             progress_callback(55, "Applying boolean operations...")
         
         # Step 3: Create valid area bitmap (zones with >=2 layers AND no obstacles)
-        valid_bitmap = (zone_bitmap >= 2) & (obstacle_bitmap == 0)
+        # Write the comparison result and the AND into the same output
+        # array instead of allocating a temporary for each step.
+        valid_bitmap = np.greater_equal(zone_bitmap, 2)
+        np.logical_and(valid_bitmap, obstacle_bitmap == 0, out=valid_bitmap)
         
         # Step 4: Apply clearance by eroding valid areas
         if progress_callback:
@@ -508,7 +832,7 @@ class ViaStitcher:
         via_radius_nm = (via_diameter * 1000000) / 2
         effective_clearance = via_radius_nm + CLEARANCE
         
-        valid_bitmap = self.apply_clearance(valid_bitmap.astype(np.uint8), effective_clearance, RESOLUTION)
+        valid_bitmap = self.apply_clearance(valid_bitmap, effective_clearance, RESOLUTION)
         
         if progress_callback:
             progress_callback(65, "Generating via grid...")
@@ -542,59 +866,49 @@ class ViaStitcher:
         if gy <= 0: gy = int(1 * SCALE)
 
         vias_to_add = []
-        
-        # Calculate total grid points for progress
-        total_cols = int((end_x - start_x) / gx) + 1
-        total_rows = int((end_y - start_y) / gy) + 1
-        total_points = total_cols * total_rows
-        points_checked = 0
-        
-        x = start_x
-        row = 0
-        while x <= end_x:
-            y = start_y
-            
-            # Apply stagger
-            offset_y = 0
-            if stagger and (row % 2 == 1):
-                offset_y = gy // 2
-            
-            y += offset_y
-            
-            while y <= end_y:
+        height, width = valid_bitmap.shape
+        via_dia_nm = int(via_diameter * SCALE)
+        via_drill_nm = int(via_drill * SCALE)
+
+        # 4. Sample the whole grid against the bitmap in one shot instead
+        # of walking it cell by cell in Python. Staggered layouts use a
+        # shifted y series for every other column.
+        xs = np.arange(start_x, end_x + 1, gx)
+        ys_even = np.arange(start_y, end_y + 1, gy)
+        if stagger:
+            ys_odd = np.arange(start_y + gy // 2, end_y + 1, gy)
+            column_sets = ((xs[0::2], ys_even), (xs[1::2], ys_odd))
+        else:
+            column_sets = ((xs, ys_even),)
+
+        for cols, rows_y in column_sets:
+            # Convert grid coordinates to pixel coordinates
+            pxs = np.trunc((cols - overall_bbox.pos.x) / RESOLUTION).astype(np.int64)
+            pys = np.trunc((rows_y - overall_bbox.pos.y) / RESOLUTION).astype(np.int64)
+
+            in_x = (pxs >= 0) & (pxs < width)
+            in_y = (pys >= 0) & (pys < height)
+            if not in_x.any() or not in_y.any():
+                continue
+
+            cols_in = cols[in_x]
+            rows_in = rows_y[in_y]
+            hits = valid_bitmap[np.ix_(pys[in_y], pxs[in_x])] > 0
+
+            # Build Via objects only for the cells that passed
+            for iy, ix in np.argwhere(hits):
                 pt = Vector2()
-                pt.x = int(x)
-                pt.y = int(y)
-                
-                # 4. Check Validity using bitmap
-                # Convert position to pixel coordinates
-                px = int((x - overall_bbox.pos.x) / RESOLUTION)
-                py = int((y - overall_bbox.pos.y) / RESOLUTION)
-                
-                # Check bounds
-                height, width = valid_bitmap.shape
-                if 0 <= px < width and 0 <= py < height:
-                    if valid_bitmap[py, px] > 0:
-                        # Valid location!
-                        v = Via() 
-                        v.position = pt
-                        v.net = target_net
-                        v.diameter = int(via_diameter * SCALE)
-                        v.drill_diameter = int(via_drill * SCALE)
-                        
-                        vias_to_add.append(v)
-                
-                y += gy
-                points_checked += 1
-                
-            x += gx
-            row += 1
-            
-            # Update progress during grid iteration (65-90%)
-            if progress_callback and total_points > 0:
-                grid_progress = 65 + (25 * points_checked / total_points)
-                progress_callback(grid_progress, f"Checking grid points ({points_checked}/{total_points})...")
-            
+                pt.x = int(cols_in[ix])
+                pt.y = int(rows_in[iy])
+
+                v = Via()
+                v.position = pt
+                v.net = target_net
+                v.diameter = via_dia_nm
+                v.drill_diameter = via_drill_nm
+
+                vias_to_add.append(v)
+
         # 5. Commit
         if progress_callback:
             progress_callback(90, f"Committing {len(vias_to_add)} vias...")
@@ -612,18 +926,29 @@ class ViaStitcher:
                     progress_callback(95, "Selecting created vias...")
                     
                 self.board.clear_selection()
-                for v in vias_to_add:
-                    self.board.add_to_selection(v)
+                try:
+                    # One round-trip for the whole batch
+                    self.board.add_to_selection(vias_to_add)
+                except TypeError:
+                    # Older kipy: one call per item
+                    for v in vias_to_add:
+                        self.board.add_to_selection(v)
                     
             except Exception as e:
                 print(f"Error adding vias: {e}")
         
 
-        if refill_after:
-            # Refill zones after stitching (only if refill_islands wasn't used)
+        if refill_after and vias_to_add:
+            # Refill zones after stitching (only if refill_islands wasn't used).
+            # Only the stitched net's zones are affected by the new vias, so
+            # prefer a targeted refill and fall back to the whole board when
+            # this kipy version doesn't take a zone list.
             if progress_callback:
                 progress_callback(99, "Refilling zones...")
-            
-            self.board.refill_zones()
-                
+
+            try:
+                self.board.refill_zones(zones)
+            except TypeError:
+                self.board.refill_zones()
+
         return len(vias_to_add)
@@ -1,44 +1,101 @@
+import threading
+import time
+
 import wx
 from stitcher import ViaStitcher
 
+# Numeric dialog fields: (attribute, user-facing label, must be positive)
+FIELDS = (
+    ("via_dia", "Via Diameter", False),
+    ("via_drill", "Via Drill", False),
+    ("grid_x", "Grid X", True),
+    ("grid_y", "Grid Y", True),
+    ("offset_x", "Offset X", False),
+    ("offset_y", "Offset Y", False),
+)
+
 class ViaStitcherDialog(wx.Dialog):
     def __init__(self, parent, board, client):
         super().__init__(parent, title="Better Via Stitcher", size=(450, 600))
         
         self.board = board
         self.client = client
-        self.stitcher = ViaStitcher(board)
-        
+        # Built lazily on first show so the dialog paints before any
+        # board scanning happens
+        self.stitcher = None
+        self._loaded = False
+
+        # Progress update throttle state
+        self._last_ui_update = 0.0
+        self._last_percent = -1
+
+        # Board-derived UI data; pure functions of the board (and the
+        # selected net), so cache them until invalidate() is called
+        self._candidates = None
+        self._other_zones_cache = {}
+
         self.init_ui()
-        
+        self.Bind(wx.EVT_SHOW, self._on_show)
+
+    def _on_show(self, event):
+        event.Skip()
+        if self._loaded or not event.IsShown():
+            return
+        self._loaded = True
+        # Scan the board off the UI thread; the dialog shows "Loading
+        # nets..." until the results come back
+        threading.Thread(target=self._load_board_data, daemon=True).start()
+
+    def _load_board_data(self):
+        if self.stitcher is None:
+            self.stitcher = ViaStitcher(self.board)
+        if self._candidates is None:
+            self._candidates = self.stitcher.get_candidate_nets()
+        wx.CallAfter(self._populate_nets)
+
+    def _populate_nets(self):
+        candidates = list(self._candidates)
+        if not candidates:
+            candidates = ["No overlapping zones found"]
+
+        self.net_choice.Set(candidates)
+        if "GND" in candidates:
+            self.net_choice.SetStringSelection("GND")
+        else:
+            self.net_choice.SetSelection(0)
+
+        self.update_zone_list()
+
+    def invalidate(self):
+        """Drop cached board-derived data (e.g. after the board changed)."""
+        self._candidates = None
+        self._other_zones_cache.clear()
+        
+    @classmethod
+    def _bold_font(cls):
+        """Bold header font, built once and shared across dialog opens."""
+        if not hasattr(cls, "_bf"):
+            font = wx.SystemSettings.GetFont(wx.SYS_DEFAULT_GUI_FONT)
+            cls._bf = font.Bold()
+        return cls._bf
+
     def init_ui(self):
         panel = wx.Panel(self)
         vbox = wx.BoxSizer(wx.VERTICAL)
         
         # Header
         info_text = wx.StaticText(panel, label="Configure Stitching Parameters")
-        font = info_text.GetFont()
-        font.SetWeight(wx.FONTWEIGHT_BOLD)
-        info_text.SetFont(font)
+        info_text.SetFont(self._bold_font())
         vbox.Add(info_text, 0, wx.ALL | wx.CENTER, 10)
         
         # Grid for form inputs
         grid_sizer = wx.FlexGridSizer(rows=8, cols=2, vgap=10, hgap=10)
         
-        # 1. Net Selection
+        # 1. Net Selection (populated on first show, see _populate_nets)
         grid_sizer.Add(wx.StaticText(panel, label="Net:"), 0, wx.ALIGN_CENTER_VERTICAL)
-        candidates = self.stitcher.get_candidate_nets()
-        if not candidates:
-            candidates = ["No overlapping zones found"]
-            
-        self.net_choice = wx.Choice(panel, choices=candidates)
+        self.net_choice = wx.Choice(panel, choices=["Loading nets..."])
+        self.net_choice.SetSelection(0)
         self.net_choice.Bind(wx.EVT_CHOICE, self.on_net_change)
-        
-        if candidates and "GND" in candidates:
-             self.net_choice.SetStringSelection("GND")
-        elif candidates:
-             self.net_choice.SetSelection(0)
-             
         grid_sizer.Add(self.net_choice, 1, wx.EXPAND)
         
         # 2. Via Diameter
@@ -90,10 +147,9 @@ class ViaStitcherDialog(wx.Dialog):
         vbox.Add(wx.StaticText(panel, label="Ignore Zones from Other Nets (Punch Through):"), 0, wx.LEFT | wx.RIGHT | wx.TOP, 15)
         self.zone_list = wx.CheckListBox(panel, size=(-1, 120))
         self.zone_ids = [] # Store IDs corresponding to list items
+        self.zone_labels = []
         vbox.Add(self.zone_list, 1, wx.ALL | wx.EXPAND, 15)
-        
-        self.update_zone_list()
-        
+
         # Progress section
         progress_box = wx.BoxSizer(wx.VERTICAL)
         
@@ -127,80 +183,139 @@ class ViaStitcherDialog(wx.Dialog):
         
     def update_zone_list(self):
         """Update the checklist of other zones based on target net"""
+        if self.stitcher is None:
+            return
+
         target_net = self.net_choice.GetStringSelection()
-        other_zones = self.stitcher.get_other_zones(target_net)
-        
-        self.zone_list.Clear()
-        self.zone_ids = []
-        
-        for z in other_zones:
-            layers_str = ", ".join(str(l) for l in z['layers'])
-            label = f"Net: {z['net']} (Layers: {layers_str})"
-            self.zone_list.Append(label)
-            self.zone_ids.append(z['id'])
+        other_zones = self._other_zones_cache.get(target_net)
+        if other_zones is None:
+            other_zones = self.stitcher.get_other_zones(target_net)
+            self._other_zones_cache[target_net] = other_zones
+
+        labels = [f"Net: {z['net']} (Layers: {', '.join(map(str, z['layers']))})"
+                  for z in other_zones]
+        new_ids = [z['id'] for z in other_zones]
+
+        # Unchanged content: don't touch the native control at all
+        if new_ids == self.zone_ids and labels == self.zone_labels:
+            return
+
+        # Carry check state over for zones that survive the rebuild
+        checked = {self.zone_ids[i] for i in self.zone_list.GetCheckedItems()}
+
+        # One native insertion and one repaint instead of one per zone
+        self.zone_list.Freeze()
+        try:
+            self.zone_list.Clear()
+            if labels:
+                self.zone_list.AppendItems(labels)
+            if checked:
+                self.zone_list.SetCheckedItems(
+                    [i for i, zid in enumerate(new_ids) if zid in checked])
+        finally:
+            self.zone_list.Thaw()
+
+        self.zone_ids = new_ids
+        self.zone_labels = labels
             
     def update_progress(self, percent, status):
-        """Update progress bar and status label"""
+        """Update progress bar and status label (UI thread only).
+
+        Throttled to ~30 Hz so a chatty progress callback doesn't spend
+        more time repainting the gauge than stitching; whole-percent
+        changes and completion always go through.
+        """
+        now = time.monotonic()
+        if (percent < 100 and int(percent) == self._last_percent
+                and now - self._last_ui_update < 1 / 30):
+            return
+        self._last_ui_update = now
+        self._last_percent = int(percent)
         self.progress_bar.SetValue(int(percent))
         self.status_label.SetLabel(status)
-        wx.SafeYield()  # Allow UI to update
-        
+
+    def _progress_from_thread(self, percent, status):
+        """Marshal progress updates from the worker onto the UI thread"""
+        wx.CallAfter(self.update_progress, percent, status)
+
     def on_stitch(self, event):
-        net_name = self.net_choice.GetStringSelection()
-        
-        try:
-            dia = float(self.via_dia.GetValue())
-            drill = float(self.via_drill.GetValue())
-            gx = float(self.grid_x.GetValue())
-            gy = float(self.grid_y.GetValue())
-            off_x = float(self.offset_x.GetValue())
-            off_y = float(self.offset_y.GetValue())
-            stagger = self.chk_stagger.GetValue()
-            refill_after = self.chk_refill_after.GetValue()
-        except ValueError:
-            wx.MessageBox("Invalid input values. Please check numbers.", "Error", wx.OK | wx.ICON_ERROR)
+        if self.stitcher is None:
+            wx.MessageBox("Still loading board data, please wait.", "Busy", wx.OK | wx.ICON_INFORMATION)
             return
 
-        if gx <= 0 or gy <= 0:
-            wx.MessageBox("Grid spacing must be positive.", "Error", wx.OK | wx.ICON_ERROR)
-            return
+        net_name = self.net_choice.GetStringSelection()
+
+        # Parse all numeric fields in one pass so a bad entry is
+        # reported by name instead of a generic "check numbers"
+        vals = {}
+        for attr, label, positive in FIELDS:
+            text = getattr(self, attr).GetValue()
+            try:
+                vals[attr] = float(text)
+            except ValueError:
+                wx.MessageBox(f"Invalid {label}: {text!r}. Please enter a number.", "Error", wx.OK | wx.ICON_ERROR)
+                return
+            if positive and vals[attr] <= 0:
+                wx.MessageBox(f"{label} must be positive.", "Error", wx.OK | wx.ICON_ERROR)
+                return
+
+        stagger = self.chk_stagger.GetValue()
+        refill_after = self.chk_refill_after.GetValue()
 
         # Disable button to prevent double clicks
         self.ok_btn.Disable()
         self.progress_bar.SetValue(0)
         self.status_label.SetLabel("Starting...")
-        
+
         # Collect ignored zones
         ignored_ids = []
         for i in range(self.zone_list.GetCount()):
             if self.zone_list.IsChecked(i):
                 ignored_ids.append(self.zone_ids[i])
-                
+
+        # Run the stitcher off the UI thread so the dialog stays
+        # responsive without pumping the event loop via wx.SafeYield
+        worker = threading.Thread(
+            target=self._stitch_worker,
+            args=(net_name, vals["via_dia"], vals["via_drill"],
+                  vals["grid_x"], vals["grid_y"],
+                  vals["offset_x"], vals["offset_y"],
+                  stagger, ignored_ids, refill_after),
+            daemon=True)
+        worker.start()
+
+    def _stitch_worker(self, net_name, dia, drill, gx, gy, off_x, off_y, stagger, ignored_ids, refill_after):
         try:
             count = self.stitcher.stitch(
-                net_name, 
-                via_diameter=dia, 
-                via_drill=drill, 
-                grid_x=gx, 
-                grid_y=gy, 
+                net_name,
+                via_diameter=dia,
+                via_drill=drill,
+                grid_x=gx,
+                grid_y=gy,
                 offset_x=off_x,
                 offset_y=off_y,
-                stagger=stagger, 
+                stagger=stagger,
                 ignored_zone_ids=ignored_ids,
                 refill_after=refill_after,
-                progress_callback=self.update_progress
+                progress_callback=self._progress_from_thread
             )
-            
-            self.progress_bar.SetValue(100)
-            self.status_label.SetLabel(f"Complete - {count} vias placed")
-            wx.MessageBox(f"Successfully placed {count} stitching vias.", "Result", wx.OK | wx.ICON_INFORMATION)
-            self.EndModal(wx.ID_OK)
-            
         except Exception as e:
-            self.progress_bar.SetValue(0)
-            self.status_label.SetLabel("Error occurred")
-            wx.MessageBox(f"Error during stitching: {str(e)}", "Error", wx.OK | wx.ICON_ERROR)
             import traceback
             traceback.print_exc()
-        finally:
-             self.ok_btn.Enable()
+            wx.CallAfter(self._on_stitch_error, e)
+            return
+
+        wx.CallAfter(self._on_stitch_done, count)
+
+    def _on_stitch_done(self, count):
+        self.progress_bar.SetValue(100)
+        self.status_label.SetLabel(f"Complete - {count} vias placed")
+        self.ok_btn.Enable()
+        wx.MessageBox(f"Successfully placed {count} stitching vias.", "Result", wx.OK | wx.ICON_INFORMATION)
+        self.EndModal(wx.ID_OK)
+
+    def _on_stitch_error(self, error):
+        self.progress_bar.SetValue(0)
+        self.status_label.SetLabel("Error occurred")
+        self.ok_btn.Enable()
+        wx.MessageBox(f"Error during stitching: {str(error)}", "Error", wx.OK | wx.ICON_ERROR)